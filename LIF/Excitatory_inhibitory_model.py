@@ -4,13 +4,18 @@
 ## Journal of computational neuroscience, 2001, vol. 11, no 1, p. 63-85.
 ## --------------------------------------
 ## This Python code executes a number of tasks as follows.
-# 1. Initializing two neuron groups 
+# 1. Initializing two neuron groups (the network is built by ei_network.py)
 # 2. Injecting Poisson input stimuli to two neuron groups
 # 3. Ploting the membrane potentials of all neurons
+# 4. Optionally streaming the spikes while simulating (see streaming.py)
+# 5. Optionally predicting the steady-state rates with the mean-field approximation (see mean_field.py)
 ## Latest update: September 4th, 2018
 
 from brian2 import *
 import visualization as vis
+from streaming import run_streaming
+from ei_network import default_parameters, build_ei_network
+from fast_access import Traces
 # populations
 N = 100
 N_E = int(N * 0.8)  # pyramidal neurons
@@ -38,10 +43,12 @@ tau_rp_I = 1. * ms
 # external stimuli
 rate = 3 * Hz
 C_ext = 1000
+seed = 42	# Seed of the counter-based random numbers (see counter_rng.py)
 
 # synapses
 C_E = N_E
 C_I = N_I
+p_I_E = 0.2	# Connection probability from P_I to P_E
 
 # AMPA (excitatory)
 g_AMPA_ext_E = 2.08 * nS
@@ -64,91 +71,14 @@ g_GABA_I = 0.973 * nS * 200. / N_I
 tau_GABA = 10. * ms
 
 
-# modeling
-eqs_E = '''
-dv / dt = (- g_m_E * (v - V_L) - I_syn) / C_m_E : volt (unless refractory)
-
-I_syn = I_AMPA_ext + I_AMPA_rec + I_NMDA_rec + I_GABA_rec : amp
-
-I_AMPA_ext = g_AMPA_ext_E * (v - V_E) * s_AMPA_ext : amp
-I_AMPA_rec = g_AMPA_rec_E * (v - V_E) * 1 * s_AMPA : amp
-ds_AMPA_ext / dt = - s_AMPA_ext / tau_AMPA : 1
-ds_AMPA / dt = - s_AMPA / tau_AMPA : 1
-
-I_NMDA_rec = g_NMDA_E * (v - V_E) / (1 + Mg2 * exp(-0.062 * v / mV) / 3.57) * s_NMDA_tot : amp
-s_NMDA_tot : 1
-
-I_GABA_rec = g_GABA_E * (v - V_I) * s_GABA : amp
-ds_GABA / dt = - s_GABA / tau_GABA : 1
-'''
-
-eqs_I = '''
-dv / dt = (- g_m_I * (v - V_L) - I_syn) / C_m_I : volt (unless refractory)
-
-I_syn = I_AMPA_ext + I_AMPA_rec + I_NMDA_rec + I_GABA_rec : amp
-
-I_AMPA_ext = g_AMPA_ext_I * (v - V_E) * s_AMPA_ext : amp
-I_AMPA_rec = g_AMPA_rec_I * (v - V_E) * 1 * s_AMPA : amp
-ds_AMPA_ext / dt = - s_AMPA_ext / tau_AMPA : 1
-ds_AMPA / dt = - s_AMPA / tau_AMPA : 1
-
-I_NMDA_rec = g_NMDA_I * (v - V_E) / (1 + Mg2 * exp(-0.062 * v / mV) / 3.57) * s_NMDA_tot : amp
-s_NMDA_tot : 1
-
-I_GABA_rec = g_GABA_I * (v - V_I) * s_GABA : amp
-ds_GABA / dt = - s_GABA / tau_GABA : 1
-'''
-
-P_E = NeuronGroup(N_E, eqs_E, threshold='v > V_thr', reset='v = V_reset', refractory=tau_rp_E, method='euler')
-P_E.v = V_L
-
-P_I = NeuronGroup(N_I, eqs_I, threshold='v > V_thr', reset='v = V_reset', refractory=tau_rp_I, method='euler')
-P_I.v = V_L
-
-eqs_glut = '''
-s_NMDA_tot_post = w * s_NMDA : 1 (summed)
-ds_NMDA / dt = - s_NMDA / tau_NMDA_decay + alpha * x * (1 - s_NMDA) : 1 (clock-driven)
-dx / dt = - x / tau_NMDA_rise : 1 (clock-driven)
-w : 1
-'''
-
-eqs_pre_glut = '''
-s_AMPA += w
-x += 1
-'''
-
-eqs_pre_gaba = '''
-s_GABA += 1
-'''
-
-eqs_pre_ext = '''
-s_AMPA_ext += 1
-'''
-
 duration = .1*second
-## Initialization of neuron connection
-
-# E to E
-C_E_E = Synapses(P_E, P_E, model=eqs_glut, on_pre=eqs_pre_glut, method='euler')
-C_E_E.connect('i!=j')
-C_E_E.w[:] = 1
-
-# E to I 
-C_E_I = Synapses(P_E, P_I, model=eqs_glut, on_pre=eqs_pre_glut, method='euler')
-C_E_I.connect()
-C_E_I.w[:] = 1
-
-# I to E_1
-C_I_E = Synapses(P_I, P_E, on_pre=eqs_pre_gaba, method='euler')
-C_I_E.connect(p=0.2)
-
-# I to I
-C_I_I = Synapses(P_I, P_I, on_pre=eqs_pre_gaba, method='euler')
-C_I_I.connect('i != j')
-
-# external noise
-C_P_E = PoissonInput(P_E, 's_AMPA_ext', C_ext, rate, '1')
-C_P_I = PoissonInput(P_I, 's_AMPA_ext', C_ext, rate, '1')
+streaming = False	# Run in chunks and publish the spikes to a (stand-in) consumer while simulating
+chunk = 1*ms		# Length of one chunk in streaming mode
+mean_field = False	# Print the steady-state rates predicted by the mean-field approximation
+## Initialization of the neuron groups, their connections and the external noise
+params = default_parameters(N)
+params.update((name, value) for name, value in globals().items() if name in params)
+(P_E, P_I), (C_E_E, C_E_I, C_I_E, C_I_I), (C_P_E, C_P_I) = build_ei_network(params, seed)
 
 ## Monitoring
 E_mon 		= SpikeMonitor(P_E)
@@ -160,11 +90,28 @@ I_sta		= StateMonitor(P_I,'v',record=True)
 LFP_E = PopulationRateMonitor(P_E)
 LFP_I = PopulationRateMonitor(P_I)
 
+if mean_field:
+	# Imported here: the mean-field solver needs scipy, the simulation does not
+	from mean_field import mean_field_rates
+	nu_E, nu_I = mean_field_rates(params)
+	print('Mean-field steady-state rates: P_E %.2f Hz, P_I %.2f Hz' % (nu_E/Hz, nu_I/Hz))
+
 # ##############################################################################
 # # Simulation run
 # ##############################################################################
 
-run(duration)
+if streaming:
+	net = Network(collect())
+	summary = run_streaming(net, {'E': E_mon, 'I': I_mon}, duration, chunk=chunk, namespace=globals(), verbose=True)
+	print('Real-time factor: %.2f, mean chunk latency: %.2f ms, max chunk latency: %.2f ms'
+		  % (summary['rtf'], summary['mean_latency']/1e-3, summary['max_latency']/1e-3))
+else:
+	run(duration)
+
+
+## Unit-free, zero-copy access to the recorded traces (see fast_access.py), time in ms
+E_v = Traces(E_sta, 'v')
+I_v = Traces(I_sta, 'v')
 
 
 ################################################################################
@@ -187,12 +134,12 @@ suptitle('Raster plot neurons')
 figure(2)
 subplot(211)
 for idx in range(N_E):
-	plot(E_sta.t/ms, E_sta.v[idx])
+	plot(E_v.t, E_v[idx])
 xlabel('Time (ms)')
 ylabel('Membrane potential (mV)')
 subplot(212)
 for idx in range(N_I):
-	plot(I_sta.t/ms, I_sta.v[idx])
+	plot(I_v.t, I_v[idx])
 xlabel('Time (ms)')
 ylabel('Membrane potential (mV)')
 suptitle('Spike traces of excitatory synapses group and inhibitory synapses group')
@@ -7,11 +7,17 @@
 # - The reserval potential is not manually set.
 # - Spiking-Timing-Dependent-Plasticity is applied to update synapses' weights.
 # - Firing rate is calculated and showed with fixed time window.
+# - All layers are fused into one NeuronGroup and all synapses into one Synapses object.
 ## Latest update: September 28th, 2018
 ## Editor: Le-Ha Hoang
 
 from brian2 import *
 import visualization as vis
+from layered_network import build_layered_network
+from counter_rng import counter_noise, uniform
+from weight_snapshots import WeightSnapshotMonitor
+from fast_access import Traces
+from live_dashboard import LiveDashboard
 start_scope()
 ##==================================================================================================
 ###================== Network parameters configuration =============================================
@@ -33,10 +39,12 @@ Apost 		= -Apre*taupre/taupost*1.05 #
 #======================================================================================
 pos			= 1					# Possible number of links between neurons, pos falls in [0,1]
 duration	= .1*second			# Simulation time
+live		= False				# Watch rasters, firing rates and weights while simulating (see live_dashboard.py)
 
 ###============== Let's make some noise==========================================
 #=================================================================================
 sigma		= 5*mvolt			# Inserting neural noises
+seed		= 42				# Seed of the counter-based random numbers (see counter_rng.py)
 
 ###============== Input stimuli===================================================
 #=================================================================================
@@ -51,45 +59,16 @@ rate		= 100*Hz			# The frequency of sine wave
 ##==============================================================================
 # Creating groups of Leaky Integrate-and-Fire neurons===========================
 ##==============================================================================
-eqs = '''
-dv/dt = (vRest-v)/tau + sigma*xi*tau**-0.5: volt
-tau : second
-'''
+## All layers share one NeuronGroup (see layered_network.py), the input layer is selected by 'layer == 0'
+## The input layer receives the sine wave current, the other layers receive the neural noise
 ## A model is defined by systems of differential equations.
-eqs_sineWave ='''
-dv/dt = (vRest-v)/tau + I/C_mem: volt
-I = ampt*sin(2*pi*rate*t) : amp
+eqs = '''
+dv/dt = (vRest-v)/tau + I/C_mem + (1-is_input)*sigma*noise*tau**-0.5: volt
+I = is_input*ampt*sin(2*pi*rate*t) : amp
+is_input : 1 (constant)
 tau : second
+noise : second**-0.5
 '''
-# Input layer with explicit input stimuli via a current
-G_1 	= NeuronGroup(numIn,
-					eqs_sineWave,	
-					threshold='v>vThres',
-					reset='v = vRest',
-					refractory=2*ms,
- 					method='euler')
-G_1.tau= '20*ms'
-G_1.v  = 'vRest'
-
-# Hidden layer
-G_2 	= NeuronGroup(numHid,
-					  eqs,
-					  threshold='v>vThres',
-					  reset='v = vRest',
-					  refractory=2*ms,
-					  method='euler')
-G_2.tau	= '20*ms'
-G_2.v  	= 'vRest'
-
-# Output layer
-G_3 	= NeuronGroup(numOut,
-					  eqs,
-					  threshold='v>vThres',
-					  reset='v = vRest',
-					  refractory=2*ms,
-					  method='euler')
-G_3.tau	= '20*ms'
-G_3.v  	= 'vRest'
 
 ##====================================================================================
 # Synaptic's weights are updated by Spike-Timing-Dependent-Plasticity learning rule===
@@ -112,23 +91,26 @@ eqs_on_post  ='''
 '''
 
 ##===================================================================================
-##======= Creating synapses between neurons of different layers =====================
+##======= Creating layers and synapses between neurons of different layers ==========
 ## ==================================================================================
-S_1	= Synapses(G_1, G_2, 
-				model = eqs_stdp,
-				on_pre = eqs_on_pre,
-				on_post = eqs_on_post,
-				method='linear')
-S_1.connect(p=pos)	# Assign the number of links; The links is proportional to 'pos' which is in the range of [0,1]
-S_1.w='rand()*wmax' # Assign the weights of synapses
-
-S_2	= Synapses(G_2, G_3, 
-				model = eqs_stdp,
-				on_pre = eqs_on_pre,
-				on_post = eqs_on_post,
-				method='linear')
-S_2.connect(p=pos)
-S_2.w='rand()*wmax'
+# G_1: Input layer, G_2: Hidden layer, G_3: Output layer
+# S_1: Input -> Hidden synapses, S_2: Hidden -> Output synapses (indices into S)
+G, (G_1, G_2, G_3), S, (S_1, S_2) = build_layered_network([numIn, numHid, numOut],
+					eqs,
+					threshold='v>vThres',
+					reset='v = vRest',
+					refractory=2*ms,
+					syn_model = eqs_stdp,
+					on_pre = eqs_on_pre,
+					on_post = eqs_on_post,
+					p=pos,	# The links is proportional to 'pos' which is in the range of [0,1]
+					method='euler',
+					seed=seed, stream=2)	# Connections drawn with the counter-based random numbers
+G.is_input	= 'int(layer == 0)'
+G.tau		= '20*ms'
+G.v			= 'vRest'
+S.w=uniform(seed, arange(len(S)), stream=1)*wmax # Assign the weights of synapses
+G_noise = counter_noise(G, 'noise', seed, stream=0) # Neural noise, replaces xi
 
 ##=====================================================================================
 ##============= Monitoring ============================================================
@@ -143,17 +125,38 @@ Input_spk		= SpikeMonitor (G_1, 'i', record=True)
 Hidden_spk		= SpikeMonitor (G_2, 'i', record=True)
 Output_spk		= SpikeMonitor (G_3, 'i', record=True)
 
-In_hid_weights	= StateMonitor (S_1,'w',record=True)
-Hid_out_weights = StateMonitor (S_2,'w',record=True)
+In_hid_weights	= StateMonitor (S,'w',record=S_1)
+Hid_out_weights = StateMonitor (S,'w',record=S_2)
+# Compressed snapshots of the whole weight matrix every 10 ms (see weight_snapshots.py)
+W_snapshots		= WeightSnapshotMonitor(S, 'w', interval=10*ms, bits=16, value_range=(0*mV, wmax))
 
 LFP_1 = PopulationRateMonitor(G_1)
 LFP_2 = PopulationRateMonitor(G_2)
 LFP_3 = PopulationRateMonitor(G_3)
 
+if live:
+	dashboard		= LiveDashboard({'Input layer': Input_spk, 'Hidden layer': Hidden_spk, 'Output layer': Output_spk},
+									duration, synapses=S, weight_indices=concatenate((S_1, S_2)))
+	dashboard_op	= dashboard.operation	# Stored so that run() collects it
+	dashboard.start()
+
 ##=====================Run simulation================================================
 run(duration)
 ##===================================================================================
 
+if live:
+	dashboard.flush(defaultclock.t)	# Publish the last interval
+	print('Dashboard overhead: %.2f%% of the simulation loop' % (100*dashboard.overhead()))
+	dashboard.stop(wait=False)
+
+
+## Unit-free, zero-copy access to the recorded traces (see fast_access.py), time in ms
+Input_v = Traces(Input_mon, 'v')
+Hidden_v = Traces(Hidden_mon, 'v')
+Output_v = Traces(Output_mon, 'v')
+In_hid_w = Traces(In_hid_weights, 'w')
+Hid_out_w = Traces(Hid_out_weights, 'w')
+
 ##===================================================================================
 ##===== Visualization and monitoring of the simulation outcome=======================
 ##===================================================================================
@@ -162,13 +165,13 @@ run(duration)
 figure(1) 
 subplot(211)
 for idx in range(numIn):
-	plot(Input_mon.t/ms, Input_mon.v[idx])
+	plot(Input_v.t, Input_v[idx])
 xlabel('Time (ms)')
 ylabel('Input layer')
 
 subplot(212)
 for idx in range(numHid):
-	plot(Hidden_mon.t/ms, Hidden_mon.v[idx])
+	plot(Hidden_v.t, Hidden_v[idx])
 xlabel('Time (ms)')
 ylabel('Hidden layer')
 suptitle('Spike traces of Input layer and Hidden layer')
@@ -177,12 +180,12 @@ suptitle('Spike traces of Input layer and Hidden layer')
 figure(2) 
 subplot(211)
 for idx in range(numHid):
-	plot(Hidden_mon.t/ms, Hidden_mon.v[idx])
+	plot(Hidden_v.t, Hidden_v[idx])
 xlabel('Time (ms)')
 ylabel('Hidden layer')
 subplot(212)
 for idx in range(numOut):
-	plot(Output_mon.t/ms, Output_mon.v[idx])
+	plot(Output_v.t, Output_v[idx])
 xlabel('Time (ms)')
 ylabel('Output layer')
 suptitle('Output layer')
@@ -243,14 +246,14 @@ suptitle('Population rate monitor')
 figure(8)### Visualization of weight update at synaptics between input layer and hidden layer
 subplot(121)
 for idx in range(numIn*numHid):
-	plot(In_hid_weights.t/ms,In_hid_weights.w[idx])
+	plot(In_hid_w.t, In_hid_w[idx])
 xlabel('Time (ms)')
 ylabel('Input- Hidden Weights ')
 suptitle('Weight update between input layer and hidden layer')
 
 subplot(122)
 for idx in range(numHid*numOut):
-	plot(Hid_out_weights.t/ms,Hid_out_weights.w[idx])
+	plot(Hid_out_w.t, Hid_out_w[idx])
 xlabel('Time (ms)')
 ylabel('Hidden- Output Weights ')
 suptitle('Weight update between output layer and hidden layer')
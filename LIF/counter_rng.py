@@ -0,0 +1,295 @@
+## Counter-based random numbers (Philox4x32-10, Salmon et al. 2011) for noise and random initialization.
+# Every random number is a pure function of (seed, stream, neuron index, timestep):
+# - no sequential RNG state, so the numbers can be generated in vectorized batches on several
+#   threads (or processes) and the results are bit-identical for any number of threads/processes,
+# - the same neuron gets the same noise at the same timestep, whatever the size of the group
+#   or the order in which the groups are updated.
+# Use a different `stream` for each random quantity (noise of each group, each initialized variable, ...).
+# The same generator is available as Brian functions (compiled with cython, or C++ in standalone mode),
+# called inside the generated code with the time step t_in_timesteps as counter:
+#	philox_uniform(seed, i, t_in_timesteps, stream), philox_normal(...), philox_poisson(lam, seed, ...)
+# The uniform and Poisson numbers are bit-identical on all targets, the normal numbers may differ in
+# the last bit between numpy and the compiled targets (log and cos of numpy and of the C library).
+# In a model, the noise term xi is replaced by a parameter updated every time step by counter_noise():
+#	dv/dt = (I-v)/tau + sigma*noise*tau**-0.5 : 1
+#	noise : second**-0.5
+#	G_1_noise = counter_noise(G_1, 'noise', seed, stream=0)
+# The returned operations belong to the group, they are run with it.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from brian2 import *
+from brian2.core.functions import DEFAULT_FUNCTIONS
+from brian2.units.fundamentalunits import get_unit, DIMENSIONLESS
+import numpy as np
+
+PHILOX_M0, PHILOX_M1 = np.uint64(0xD2511F53), np.uint64(0xCD9E8D57)
+PHILOX_W0, PHILOX_W1 = np.uint64(0x9E3779B9), np.uint64(0xBB67AE85)
+MASK32 = np.uint64(0xFFFFFFFF)
+# Below this number of values, a single thread is used
+MIN_BATCH = 65536
+
+
+def philox(seed, index, step=0, stream=0):
+	'''Philox4x32-10 with counter (index, stream, step) and key seed: four arrays of 32 bit words.'''
+	index = np.asarray(index, dtype=np.uint64)
+	step = np.uint64(step)
+	c0 = index & MASK32
+	c1 = (index >> np.uint64(32)) ^ (np.uint64(stream) << np.uint64(16))
+	c2 = np.full_like(c0, step & MASK32)
+	c3 = np.full_like(c0, step >> np.uint64(32))
+	k0 = np.uint64(seed) & MASK32
+	k1 = (np.uint64(seed) >> np.uint64(32)) & MASK32
+	for _ in range(10):
+		p0 = PHILOX_M0*c0
+		p1 = PHILOX_M1*c2
+		c0, c1, c2, c3 = ((p1 >> np.uint64(32)) ^ c1 ^ k0, p1 & MASK32,
+						  (p0 >> np.uint64(32)) ^ c3 ^ k1, p0 & MASK32)
+		k0 = (k0 + PHILOX_W0) & MASK32
+		k1 = (k1 + PHILOX_W1) & MASK32
+	return c0, c1, c2, c3
+
+
+def _to_double(a, b):
+	'''53 bit uniform double in [0, 1) from two 32 bit words.'''
+	return ((a >> np.uint64(5)).astype(np.float64)*67108864. + (b >> np.uint64(6)).astype(np.float64))/9007199254740992.
+
+
+def _uniform(seed, index, step, stream):
+	c0, c1, c2, c3 = philox(seed, index, step, stream)
+	return _to_double(c0, c1)
+
+
+def _normal(seed, index, step, stream):
+	# Box-Muller
+	c0, c1, c2, c3 = philox(seed, index, step, stream)
+	u1 = 1. - _to_double(c0, c1)	# in (0, 1]
+	u2 = _to_double(c2, c3)
+	return np.sqrt(-2.*np.log(u1))*np.cos(2*np.pi*u2)
+
+
+def _poisson(lam, seed, index, step, stream):
+	# Inversion of the cumulative distribution, well suited to the small means of a single time step
+	u = _uniform(seed, index, step, stream)
+	lam = np.broadcast_to(np.asarray(lam, dtype=np.float64), u.shape)
+	k = np.zeros(u.shape, dtype=np.int64)
+	p = np.exp(-lam)
+	cdf = p.copy()
+	todo = u >= cdf
+	while np.any(todo):
+		k[todo] += 1
+		p = p*lam/np.maximum(k, 1)
+		cdf = cdf + p
+		todo &= u >= cdf
+		todo &= p > 0	# rounding of the cumulative distribution for large means
+	return k
+
+
+def _batched(func, index, num_threads, *args):
+	'''Evaluate func(index, ...) in batches on num_threads threads, the result does not depend on num_threads.'''
+	index = np.asarray(index)
+	if num_threads is None:
+		num_threads = max(1, min(os.cpu_count() or 1, len(index)//MIN_BATCH))
+	if num_threads <= 1:
+		return func(index, *args)
+	with ThreadPoolExecutor(num_threads) as pool:
+		batches = pool.map(lambda batch: func(batch, *args), np.array_split(index, num_threads))
+		return np.concatenate(list(batches))
+
+
+def uniform(seed, index, step=0, stream=0, num_threads=None):
+	'''Uniform numbers in [0, 1), one per index (replaces rand() in initializations).'''
+	return _batched(lambda i, *args: _uniform(seed, i, *args), index, num_threads, step, stream)
+
+
+def normal(seed, index, step=0, stream=0, num_threads=None):
+	'''Standard normal numbers, one per index.'''
+	return _batched(lambda i, *args: _normal(seed, i, *args), index, num_threads, step, stream)
+
+
+def poisson(lam, seed, index, step=0, stream=0, num_threads=None):
+	'''Poisson distributed counts with mean lam (scalar), one per index.'''
+	return _batched(lambda i, *args: _poisson(lam, seed, i, *args), index, num_threads, step, stream)
+
+
+## Compiled versions of philox, _uniform, _normal and _poisson (same operations), for cython and C++ standalone
+PHILOX_CYTHON = '''
+cdef inline void _philox4x32(unsigned long long seed, unsigned long long index, unsigned long long step,
+							 unsigned long long stream, unsigned long long* c):
+	cdef unsigned long long mask = 0xFFFFFFFF
+	cdef unsigned long long m0 = 0xD2511F53, m1 = 0xCD9E8D57, w0 = 0x9E3779B9, w1 = 0xBB67AE85
+	cdef unsigned long long c0 = index & mask, c1 = (index >> 32) ^ (stream << 16)
+	cdef unsigned long long c2 = step & mask, c3 = step >> 32
+	cdef unsigned long long k0 = seed & mask, k1 = (seed >> 32) & mask
+	cdef unsigned long long p0, p1
+	cdef int r
+	for r in range(10):
+		p0 = m0*c0
+		p1 = m1*c2
+		c0 = (p1 >> 32) ^ c1 ^ k0
+		c1 = p1 & mask
+		c2 = (p0 >> 32) ^ c3 ^ k1
+		c3 = p0 & mask
+		k0 = (k0 + w0) & mask
+		k1 = (k1 + w1) & mask
+	c[0] = c0
+	c[1] = c1
+	c[2] = c2
+	c[3] = c3
+
+cdef inline double _philox_to_double(unsigned long long a, unsigned long long b):
+	return (<double>(a >> 5)*67108864. + <double>(b >> 6))/9007199254740992.
+
+cdef inline double philox_uniform(unsigned long long seed, unsigned long long index, unsigned long long step,
+						   unsigned long long stream):
+	cdef unsigned long long c[4]
+	_philox4x32(seed, index, step, stream, c)
+	return _philox_to_double(c[0], c[1])
+'''
+
+PHILOX_NORMAL_CYTHON = '''
+from libc.math cimport sqrt as _philox_sqrt, log as _philox_log, cos as _philox_cos, M_PI as _philox_pi
+
+cdef inline double philox_normal(unsigned long long seed, unsigned long long index, unsigned long long step,
+						  unsigned long long stream):
+	cdef unsigned long long c[4]
+	_philox4x32(seed, index, step, stream, c)
+	cdef double u1 = 1. - _philox_to_double(c[0], c[1])
+	cdef double u2 = _philox_to_double(c[2], c[3])
+	return _philox_sqrt(-2.*_philox_log(u1))*_philox_cos(2*_philox_pi*u2)
+'''
+
+PHILOX_POISSON_CYTHON = '''
+from libc.math cimport exp as _philox_exp
+
+cdef inline long philox_poisson(double lam, unsigned long long seed, unsigned long long index,
+						 unsigned long long step, unsigned long long stream):
+	cdef double u = philox_uniform(seed, index, step, stream)
+	cdef long k = 0
+	cdef double p = _philox_exp(-lam)
+	cdef double cdf = p
+	while u >= cdf:
+		k += 1
+		p = p*lam/k
+		cdf = cdf + p
+		if not p > 0:
+			break
+	return k
+'''
+
+PHILOX_CPP = '''
+static inline void _philox4x32(unsigned long long seed, unsigned long long index, unsigned long long step,
+							   unsigned long long stream, unsigned long long* c)
+{
+	const unsigned long long mask = 0xFFFFFFFFULL;
+	unsigned long long c0 = index & mask, c1 = (index >> 32) ^ (stream << 16);
+	unsigned long long c2 = step & mask, c3 = step >> 32;
+	unsigned long long k0 = seed & mask, k1 = (seed >> 32) & mask;
+	for (int r = 0; r < 10; r++)
+	{
+		const unsigned long long p0 = 0xD2511F53ULL*c0;
+		const unsigned long long p1 = 0xCD9E8D57ULL*c2;
+		c0 = (p1 >> 32) ^ c1 ^ k0;
+		c1 = p1 & mask;
+		c2 = (p0 >> 32) ^ c3 ^ k1;
+		c3 = p0 & mask;
+		k0 = (k0 + 0x9E3779B9ULL) & mask;
+		k1 = (k1 + 0xBB67AE85ULL) & mask;
+	}
+	c[0] = c0; c[1] = c1; c[2] = c2; c[3] = c3;
+}
+
+static inline double _philox_to_double(unsigned long long a, unsigned long long b)
+{
+	return ((double)(a >> 5)*67108864. + (double)(b >> 6))/9007199254740992.;
+}
+
+static inline double philox_uniform(unsigned long long seed, unsigned long long index,
+									unsigned long long step, unsigned long long stream)
+{
+	unsigned long long c[4];
+	_philox4x32(seed, index, step, stream, c);
+	return _philox_to_double(c[0], c[1]);
+}
+'''
+
+PHILOX_NORMAL_CPP = '''
+static inline double philox_normal(unsigned long long seed, unsigned long long index,
+								   unsigned long long step, unsigned long long stream)
+{
+	unsigned long long c[4];
+	_philox4x32(seed, index, step, stream, c);
+	const double u1 = 1. - _philox_to_double(c[0], c[1]);
+	const double u2 = _philox_to_double(c[2], c[3]);
+	return sqrt(-2.*log(u1))*cos(2*M_PI*u2);
+}
+'''
+
+PHILOX_POISSON_CPP = '''
+static inline int32_t philox_poisson(double lam, unsigned long long seed, unsigned long long index,
+									 unsigned long long step, unsigned long long stream)
+{
+	const double u = philox_uniform(seed, index, step, stream);
+	int32_t k = 0;
+	double p = exp(-lam);
+	double cdf = p;
+	while (u >= cdf)
+	{
+		k++;
+		p = p*lam/k;
+		cdf = cdf + p;
+		if (!(p > 0))
+			break;
+	}
+	return k;
+}
+'''
+
+philox_uniform = Function(lambda seed, index, step, stream: _uniform(int(seed), index, int(step), int(stream)),
+						  arg_units=[1, 1, 1, 1], arg_names=['seed', 'index', 'step', 'stream'],
+						  arg_types=['integer', 'integer', 'integer', 'integer'], return_unit=1)
+philox_uniform.implementations.add_implementation('cython', PHILOX_CYTHON, name='philox_uniform')
+philox_uniform.implementations.add_implementation('cpp', PHILOX_CPP, name='philox_uniform')
+
+philox_normal = Function(lambda seed, index, step, stream: _normal(int(seed), index, int(step), int(stream)),
+						 arg_units=[1, 1, 1, 1], arg_names=['seed', 'index', 'step', 'stream'],
+						 arg_types=['integer', 'integer', 'integer', 'integer'], return_unit=1)
+philox_normal.implementations.add_implementation('cython', PHILOX_NORMAL_CYTHON, name='philox_normal',
+												 dependencies={'philox_uniform': philox_uniform})
+philox_normal.implementations.add_implementation('cpp', PHILOX_NORMAL_CPP, name='philox_normal',
+												 dependencies={'philox_uniform': philox_uniform})
+
+philox_poisson = Function(lambda lam, seed, index, step, stream: _poisson(lam, int(seed), index, int(step), int(stream)),
+						  arg_units=[1, 1, 1, 1, 1], arg_names=['lam', 'seed', 'index', 'step', 'stream'],
+						  arg_types=['float', 'integer', 'integer', 'integer', 'integer'],
+						  return_unit=1, return_type='integer')
+philox_poisson.implementations.add_implementation('cython', PHILOX_POISSON_CYTHON, name='philox_poisson',
+												  dependencies={'philox_uniform': philox_uniform})
+philox_poisson.implementations.add_implementation('cpp', PHILOX_POISSON_CPP, name='philox_poisson',
+												  dependencies={'philox_uniform': philox_uniform})
+
+# Registered with the built-in functions, so that they can be used in any model (like rand() or randn())
+DEFAULT_FUNCTIONS.update(philox_uniform=philox_uniform, philox_normal=philox_normal, philox_poisson=philox_poisson)
+
+
+def counter_noise(group, variable, seed, stream=0):
+	'''
+	Operation replacing xi: every time step, `variable` (unit second**-0.5) of `group` is set
+	to N(0, 1)/sqrt(dt), so that sigma*variable*dt has the statistics of sigma*xi*dt with the euler method.
+	'''
+	return group.run_regularly('%s = philox_normal(%d, i, t_in_timesteps, %d)/sqrt(dt)' % (variable, seed, stream),
+							   when='before_groups')
+
+
+def counter_poisson_input(group, variable, N, rate, weight, seed, stream=0):
+	'''
+	Operation replacing PoissonInput(group, variable, N, rate, weight) (weight is a number
+	or a quantity with the units of `variable`): every time step, each neuron receives a
+	Poisson distributed number of input spikes with mean N*rate*dt.
+	'''
+	lam = N*float(rate)*float(group.clock.dt)
+	dim = group.variables[variable].dim
+	weight = repr(float(weight)) if dim is DIMENSIONLESS else '%r*%r' % (float(weight), get_unit(dim))
+	return group.run_regularly('%s += %s*philox_poisson(%r, %d, i, t_in_timesteps, %d)'
+							   % (variable, weight, lam, seed, stream), when='synapses')
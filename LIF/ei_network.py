@@ -0,0 +1,119 @@
+## Excitatory-inhibitory network of Excitatory_inhibitory_model.py
+## BRUNEL, Nicolas et WANG, Xiao-Jing. Journal of computational neuroscience, 2001, vol. 11, no 1, p. 63-85.
+# The network is built in this single place, both by the script and by the spiking simulations of
+# the mean-field calibration (see mean_field.py):
+# - P_E and P_I share the same equations, the population specific parameters (e.g. g_m_E, g_m_I)
+#   are given to each group as g_m, C_m, ... through its namespace,
+# - the random connections and the external noise are drawn with counter-based random numbers
+#   (see counter_rng.py), so that the seed fully determines the simulation.
+# Usage (the returned objects must be stored in variables so that run() collects them):
+#	params = default_parameters(N)
+#	(P_E, P_I), (C_E_E, C_E_I, C_I_E, C_I_I), (C_P_E, C_P_I) = build_ei_network(params, seed)
+
+from brian2 import *
+from counter_rng import counter_poisson_input, uniform
+
+eqs = '''
+dv / dt = (- g_m * (v - V_L) - I_syn) / C_m : volt (unless refractory)
+
+I_syn = I_AMPA_ext + I_AMPA_rec + I_NMDA_rec + I_GABA_rec : amp
+
+I_AMPA_ext = g_AMPA_ext * (v - V_E) * s_AMPA_ext : amp
+I_AMPA_rec = g_AMPA_rec * (v - V_E) * 1 * s_AMPA : amp
+ds_AMPA_ext / dt = - s_AMPA_ext / tau_AMPA : 1
+ds_AMPA / dt = - s_AMPA / tau_AMPA : 1
+
+I_NMDA_rec = g_NMDA * (v - V_E) / (1 + Mg2 * exp(-0.062 * v / mV) / 3.57) * s_NMDA_tot : amp
+s_NMDA_tot : 1
+
+I_GABA_rec = g_GABA * (v - V_I) * s_GABA : amp
+ds_GABA / dt = - s_GABA / tau_GABA : 1
+'''
+
+eqs_glut = '''
+s_NMDA_tot_post = w * s_NMDA : 1 (summed)
+ds_NMDA / dt = - s_NMDA / tau_NMDA_decay + alpha * x * (1 - s_NMDA) : 1 (clock-driven)
+dx / dt = - x / tau_NMDA_rise : 1 (clock-driven)
+w : 1
+'''
+
+eqs_pre_glut = '''
+s_AMPA += w
+x += 1
+'''
+
+eqs_pre_gaba = '''
+s_GABA += 1
+'''
+
+
+def default_parameters(N=100):
+	'''The parameter set of Excitatory_inhibitory_model.py (same names).'''
+	N_E = int(N * 0.8)
+	N_I = int(N * 0.2)
+	return {'N_E': N_E, 'N_I': N_I,
+			'V_L': -70. * mV, 'V_thr': -50. * mV, 'V_reset': -60. * mV, 'V_E': 0. * mV, 'V_I': -70. * mV,
+			'C_m_E': 0.5 * nF, 'C_m_I': 0.2 * nF,
+			'g_m_E': 25. * nS, 'g_m_I': 20. * nS,
+			'tau_rp_E': 2. * ms, 'tau_rp_I': 1. * ms,
+			'rate': 3 * Hz, 'C_ext': 1000,
+			'g_AMPA_ext_E': 2.08 * nS, 'g_AMPA_rec_E': 0.104 * nS * 800. / N_E,
+			'g_AMPA_ext_I': 1.62 * nS, 'g_AMPA_rec_I': 0.081 * nS * 800. / N_E,
+			'tau_AMPA': 2. * ms,
+			'g_NMDA_E': 0.327 * nS * 800. / N_E, 'g_NMDA_I': 0.258 * nS * 800. / N_E,
+			'tau_NMDA_rise': 2. * ms, 'tau_NMDA_decay': 100. * ms, 'alpha': 0.5 / ms, 'Mg2': 1.,
+			'g_GABA_E': 1.25 * nS * 200. / N_I, 'g_GABA_I': 0.973 * nS * 200. / N_I,
+			'tau_GABA': 10. * ms,
+			'p_I_E': 0.2}	# Connection probability from P_I to P_E
+
+
+def build_ei_network(params=None, seed=42):
+	'''
+	Create the populations, their connections and the external Poisson noise.
+
+	params : dict of (scalar) parameters as returned by default_parameters()
+	seed : seed of the counter-based external noise (streams 0 and 1 for P_E and P_I)
+		and of the connections from P_I to P_E (stream 2)
+
+	Returns ((P_E, P_I), (C_E_E, C_E_I, C_I_E, C_I_I), (C_P_E, C_P_I)).
+	'''
+	if params is None:
+		params = default_parameters()
+	namespace = dict(params)
+	groups = {}
+	for pop in ('E', 'I'):
+		pop_namespace = dict(namespace)
+		for name in ('g_m', 'C_m', 'g_AMPA_ext', 'g_AMPA_rec', 'g_NMDA', 'g_GABA'):
+			pop_namespace[name] = params[name + '_' + pop]
+		groups[pop] = NeuronGroup(params['N_' + pop], eqs, threshold='v > V_thr', reset='v = V_reset',
+								  refractory=params['tau_rp_' + pop], method='euler', namespace=pop_namespace)
+		groups[pop].v = params['V_L']
+	P_E, P_I = groups['E'], groups['I']
+
+	# E to E
+	C_E_E = Synapses(P_E, P_E, model=eqs_glut, on_pre=eqs_pre_glut, method='euler', namespace=namespace)
+	C_E_E.connect('i!=j')
+	C_E_E.w[:] = 1
+
+	# E to I
+	C_E_I = Synapses(P_E, P_I, model=eqs_glut, on_pre=eqs_pre_glut, method='euler', namespace=namespace)
+	C_E_I.connect()
+	C_E_I.w[:] = 1
+
+	# I to E, the pair (i, j) is connected if its uniform number (index i*N_E + j) is below p_I_E
+	C_I_E = Synapses(P_I, P_E, on_pre=eqs_pre_gaba, method='euler', namespace=namespace)
+	pre, post = divmod(flatnonzero(uniform(seed, arange(len(P_I)*len(P_E)), stream=2) < params['p_I_E']), len(P_E))
+	if len(pre):
+		C_I_E.connect(i=pre, j=post)
+	else:
+		C_I_E.connect(False)	# Brian cannot connect empty index arrays (e.g. p_I_E = 0)
+
+	# I to I
+	C_I_I = Synapses(P_I, P_I, on_pre=eqs_pre_gaba, method='euler', namespace=namespace)
+	C_I_I.connect('i != j')
+
+	# external noise
+	C_P_E = counter_poisson_input(P_E, 's_AMPA_ext', params['C_ext'], params['rate'], 1, seed, stream=0)
+	C_P_I = counter_poisson_input(P_I, 's_AMPA_ext', params['C_ext'], params['rate'], 1, seed, stream=1)
+
+	return (P_E, P_I), (C_E_E, C_E_I, C_I_E, C_I_I), (C_P_E, C_P_I)
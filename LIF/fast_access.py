@@ -0,0 +1,61 @@
+## Fast, unit-free access to the recorded traces of a StateMonitor.
+# `mon.v[idx]` builds a new Quantity (with unit bookkeeping, and a copy) at every access, which
+# dominates the post-processing of thousands of traces. A Traces object instead returns plain
+# NumPy arrays, expressed in a unit declared ONCE:
+# - a single row or a slice of rows is a zero-copy view on the recorded data when the declared
+#   unit is the SI unit of the variable (e.g. volt), otherwise only the selected part is scaled,
+# - several rows (list or array of indices) are selected in one batch,
+# - the time axis can be sliced (by time step, or by time with window()), without ever
+#   materializing the full array.
+#	v = Traces(E_sta, 'v', mV)
+#	for idx in range(N_E):
+#		plot(v.t, v[idx])				# t in ms, v in mV
+#	v[[0, 5, 7], v.window(20*ms, 50*ms)]	# 3 traces between 20 and 50 ms, shape (3, steps)
+# The row indices are the indices of the recorded neurons/synapses, as for mon.v[idx].
+
+from brian2 import *
+from brian2.units.fundamentalunits import get_dimensions, DimensionMismatchError
+import numpy as np
+
+
+class Traces(object):
+	'''
+	monitor : StateMonitor
+	variable : name of the recorded variable
+	unit : unit of the returned values, by default the SI unit of the variable
+	time_unit : unit of the time axis `t`
+	'''
+	def __init__(self, monitor, variable, unit=None, time_unit=ms):
+		dim = monitor.variables[variable].dim
+		if unit is not None and get_dimensions(unit) != dim:
+			raise DimensionMismatchError('Cannot express %s in %s' % (variable, unit), dim, get_dimensions(unit))
+		self.monitor = monitor
+		self.variable = variable
+		self.scale = 1. if unit is None else float(unit)
+		self.time_scale = float(time_unit)
+
+	def _data(self):
+		# The recorded array (time, rows). Fetched at every access: it is reallocated while recording.
+		return self.monitor.variables[self.variable].get_value()
+
+	@property
+	def t(self):
+		'''Recorded times, in time_unit.'''
+		t = self.monitor.variables['t'].get_value()
+		return t if self.time_scale == 1. else t/self.time_scale
+
+	def window(self, start=None, end=None):
+		'''Slice of the time steps between the times start (included) and end (excluded).'''
+		t = self.monitor.variables['t'].get_value()
+		first = 0 if start is None else np.searchsorted(t, float(start) - 1e-12)
+		last = len(t) if end is None else np.searchsorted(t, float(end) - 1e-12)
+		return slice(first, last)
+
+	def __len__(self):
+		return self._data().shape[1]
+
+	def __getitem__(self, item):
+		'''traces[rows] or traces[rows, steps], rows in the order of the recorded indices.'''
+		rows, steps = item if isinstance(item, tuple) else (item, slice(None))
+		values = self._data()[steps, rows].T
+		return values if self.scale == 1. else values/self.scale
@@ -0,0 +1,83 @@
+## Builder for layered feed-forward networks of LIF neurons.
+# All layers live in ONE NeuronGroup and every plastic projection lives in ONE Synapses object.
+# - Each layer is exposed as a Subgroup view (G[a:b]), so StateMonitor, SpikeMonitor and
+#   PopulationRateMonitor can still be attached per layer.
+# - Each projection (layer k -> layer k+1) is exposed as an array of synapse indices,
+#   which can be passed to StateMonitor(S, 'w', record=...) to monitor that projection only.
+# - The number of code objects (and the per-step overhead) does not grow with the depth,
+#   a 20-layer network costs as much dispatch as a single group.
+# - Each neuron only draws its targets in the next layer, so the connection cost grows with the
+#   number of possible synapses, not with the square of the total number of neurons.
+# - With a seed, the connections are drawn with counter-based random numbers (see counter_rng.py).
+
+from brian2 import *
+from counter_rng import uniform
+
+
+def build_layered_network(layer_sizes, model, threshold, reset, refractory,
+						  syn_model, on_pre, on_post=None, p=1, method='euler',
+						  syn_method='linear', namespace=None, seed=None, stream=0):
+	'''
+	Create a fused layered network.
+
+	layer_sizes : list with the number of neurons per layer, e.g. [numIn, numHid, numOut]
+	model, threshold, reset, refractory, method : as for NeuronGroup, shared by all layers.
+		The integer variable 'layer' (index of the layer of each neuron) is added to the
+		model and can be used in the equations, e.g. to give the input layer its stimulus.
+	syn_model, on_pre, on_post, syn_method : as for Synapses, shared by all projections.
+		The integer variable 'projection' (index of the source layer) is added to the model.
+	p : connection probability between two consecutive layers
+	seed, stream : if seed is given, the pair (i, j) is connected if its counter-based uniform
+		number (index i*N + j in `stream`) is below p, otherwise Brian's random numbers are used
+
+	Returns (G, layers, S, projections) where layers is the list of Subgroups and
+	projections[k] holds the indices of the synapses from layer k to layer k+1.
+	'''
+	N = sum(layer_sizes)
+	G = NeuronGroup(N,
+					model + '\nlayer : integer (constant)\nnext_start : integer (constant)\nnext_end : integer (constant)\n',
+					threshold=threshold,
+					reset=reset,
+					refractory=refractory,
+					method=method,
+					namespace=namespace)
+
+	layers = []
+	start = 0
+	for n, size in enumerate(layer_sizes):
+		layers.append(G[start:start+size])
+		G.layer[start:start+size] = n
+		# Index range of the next layer (empty for the last layer)
+		G.next_start[start:start+size] = start + size
+		G.next_end[start:start+size] = start + size + (layer_sizes[n+1] if n+1 < len(layer_sizes) else 0)
+		start += size
+
+	S = Synapses(G, G,
+				 model=syn_model + '\nprojection : integer (constant)\n',
+				 on_pre=on_pre,
+				 on_post=on_post,
+				 method=syn_method,
+				 namespace=namespace)
+	if seed is None:
+		S.connect(j='k for k in sample(next_start_pre, next_end_pre, p=%r)' % float(p))
+	else:
+		pre, post = [zeros(0, dtype=int)], [zeros(0, dtype=int)]
+		start = 0
+		for size, next_size in zip(layer_sizes[:-1], layer_sizes[1:]):
+			# All the pairs (pre, post) between this layer and the next one
+			sources = start + arange(size)
+			targets = start + size + arange(next_size)
+			k = flatnonzero(uniform(seed, (sources[:, None]*N + targets).ravel(), stream=stream) < p)
+			pre.append(sources[k//next_size])
+			post.append(targets[k % next_size])
+			start += size
+		pre, post = concatenate(pre), concatenate(post)
+		if len(pre):
+			S.connect(i=pre, j=post)
+		else:
+			S.connect(False)	# Brian cannot connect empty index arrays
+	S.projection = 'layer_pre'
+
+	projections = [flatnonzero(S.projection[:] == k) for k in range(len(layer_sizes) - 1)]
+
+	return G, layers, S, projections
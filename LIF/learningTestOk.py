@@ -1,6 +1,9 @@
 # Show time!!!
 
 from brian2 import *
+from counter_rng import counter_noise, uniform
+from weight_snapshots import WeightSnapshotMonitor
+from fast_access import Traces
 start_scope()
 
 ### Parameters defined ###
@@ -10,6 +13,7 @@ vRestPre	=0.4	# Threshold voltage of pre-synaptic neurons
 vRestPos	=0.5	# Threshold voltage of post-synaptic neurons
 run_time	=0.1*second
 pos			=1		# Forming fully-connected-layer network
+seed		=42		# Seed of the counter-based random numbers (see counter_rng.py)
 sigma		=0.05	# Adding neural noises
 
 
@@ -19,9 +23,10 @@ Apre = 0.01
 Apost = -Apre*taupre/taupost*1.05
 ### Setting up one variant of LIF model ### 
 eqs = '''
-dv/dt = (I-v)/tau + sigma*xi*tau**-0.5: 1
+dv/dt = (I-v)/tau + sigma*noise*tau**-0.5: 1
 I : 1
 tau : second
+noise : second**-0.5
 '''
 
 ### Input current and mebrane voltage are randomnized in [0,1]
@@ -29,15 +34,17 @@ tau : second
 ### Initializing the architecture of pre-synaptic neurons
 
 G_1 = NeuronGroup(numPre, eqs, threshold='v>vRestPre', reset='v = 0',refractory=0.5*ms, method='euler')
-G_1.I  ='rand()'
-G_1.tau= '30*rand()*ms'
-G_1.v  = 'rand()'
+G_1.I  = uniform(seed, arange(numPre), stream=0)
+G_1.tau= 30*uniform(seed, arange(numPre), stream=1)*ms
+G_1.v  = uniform(seed, arange(numPre), stream=2)
+G_1_noise = counter_noise(G_1, 'noise', seed, stream=3)
 
 #### Initializing the architecture of post-synaptic neurons
 G_2 	= NeuronGroup(numPos, eqs, threshold='v>vRestPos', reset='v = 0',refractory=0.5*ms, method='euler')
-G_2.I	='rand()'
-G_2.tau	= '50*rand()*ms'
-G_2.v	= 'rand()'
+G_2.I	= uniform(seed, arange(numPos), stream=4)
+G_2.tau	= 50*uniform(seed, arange(numPos), stream=5)*ms
+G_2.v	= uniform(seed, arange(numPos), stream=6)
+G_2_noise = counter_noise(G_2, 'noise', seed, stream=7)
 
 
 ### Connecting the pre-synapse neurons to post-synapse neurons
@@ -65,7 +72,7 @@ apost += Apost
 w = clip(w+apre, 0, wmax)
 ''', method='linear')
 S.connect(p=pos)
-S.w='rand()*wmax'
+S.w=uniform(seed, arange(len(S)), stream=8)*wmax
 
 
 ### Start simulating behavior of neurons
@@ -74,8 +81,15 @@ M_2 		= StateMonitor (G_2, 'v', record=True)
 spikes_1 	= SpikeMonitor (G_1,'i',record= True)
 spikes_2 	= SpikeMonitor (G_2,'i',record= True)
 weight		= StateMonitor (S,'w',record=True)
+W_snapshots	= WeightSnapshotMonitor(S, 'w', interval=10*ms, bits=16, value_range=(0, wmax)) # Compressed snapshots of the weight matrix
 run(run_time)
 
+## Unit-free, zero-copy access to the recorded traces (see fast_access.py), time in ms
+M_1_v = Traces(M_1, 'v')
+M_2_v = Traces(M_2, 'v')
+weight_w = Traces(weight, 'w')
+
+
 ### Visualizing the membrane traces (membrane potential) of each neuron
 ### Top figure shows traces of Pre-synaptic neurons
 ### Bottom figure shows traces of Post-synaptic neurons
@@ -83,14 +97,14 @@ run(run_time)
 figure(1)
 subplot(211)
 for idx in range(numPre):
-	plot(M_1.t/ms, M_1.v[idx], label='Neuron '+str(idx))
+	plot(M_1_v.t, M_1_v[idx], label='Neuron '+str(idx))
 axhline(vRestPre, ls='-',c='C1', lw=0.5, label='Threshold')
 xlabel('Time (ms)')
 ylabel('Pre-synaptic traces')
 legend()
 subplot(212)
 for idx in range(numPos):
-	plot(M_2.t/ms, M_2.v[idx], label='Neuron '+str(idx))
+	plot(M_2_v.t, M_2_v[idx], label='Neuron '+str(idx))
 axhline(vRestPos, ls='-',c='C2', lw=0.5,label='Threshold')
 xlabel('Time (ms)')
 ylabel('Post-synaptic traces')
@@ -142,7 +156,7 @@ suptitle('Output spikes over the time course')
 
 figure(4)
 for idx in range(numPre*numPos):
-	plot(weight.t/ms,weight.w[idx],label='weight '+str(idx))
+	plot(weight_w.t, weight_w[idx],label='weight '+str(idx))
 xlabel('Time (ms)')
 ylabel('weights change')
 legend()
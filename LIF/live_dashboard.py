@@ -0,0 +1,259 @@
+## Live dashboard: watch rasters, firing rates and weights while the simulation is running.
+# - The simulation side is a NetworkOperation which, every `update_every` of simulated time,
+#   copies ONLY the new monitor data (new spikes, spike counts, current weights) into shared memory.
+# - The figures are drawn by a separate process which reads the shared memory and redraws
+#   at a throttled frame rate (`fps`). Rendering never blocks the simulation loop.
+# - The time spent in the NetworkOperation is accumulated in `update_time`, so that the
+#   overhead can be compared to the time of the simulation loop (it should stay well below 5%).
+# Usage (the NetworkOperation must be stored in a variable so that run() collects it):
+#	dashboard		= LiveDashboard({'Input': Input_spk}, duration, synapses=S)
+#	dashboard_op	= dashboard.operation
+#	dashboard.start()
+#	run(duration)
+#	dashboard.stop(defaultclock.t)
+# The renderer is started with 'fork' where available (Linux, macOS), so that the script is not
+# re-imported in the renderer process. Where only 'spawn' exists (Windows), the script has to
+# guard its simulation with `if __name__ == '__main__':`.
+
+import threading
+import time
+import warnings
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.shared_memory import SharedMemory
+
+from brian2 import *
+import numpy as np
+
+# Fields of the header array
+FRAME, SPIKE_COUNT, DONE, ATTACHED = 0, 1, 2, 3
+
+
+def _shared_array(shape, dtype, name=None):
+	'''Create (name=None) or attach to a numpy array stored in shared memory.'''
+	nbytes = max(int(np.prod(shape))*np.dtype(dtype).itemsize, 1)
+	if name is None:
+		shm = SharedMemory(create=True, size=nbytes)
+	else:
+		shm = SharedMemory(name=name)
+	array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+	if name is None:
+		array[...] = 0
+	return shm, array
+
+
+class LiveDashboard(object):
+	'''
+	spike_monitors : dict {name: SpikeMonitor}, one raster and one rate trace per monitor
+	duration : total simulated time, used to size the shared buffers
+	synapses : optional Synapses object whose weights are shown as trajectories
+	weight_indices : indices of the synapses to show (default: all, up to max_weights)
+	variable : name of the weight variable of `synapses`
+	update_every : simulated time between two updates of the shared memory
+	fps : maximal number of redraws per second of the renderer
+	window : length of the raster window shown (most recent spikes)
+	max_spikes : capacity of the shared spike ring buffer
+	'''
+	def __init__(self, spike_monitors, duration, synapses=None, weight_indices=None, variable='w',
+				 update_every=10*ms, fps=5, window=200*ms, max_spikes=100000, max_weights=200):
+		self.names = list(spike_monitors.keys())
+		self.monitors = [spike_monitors[name] for name in self.names]
+		self.sizes = [len(mon.source) for mon in self.monitors]
+		self.synapses = synapses
+		self.variable = variable
+		if synapses is None:
+			self.weight_indices = np.zeros(0, dtype=int)
+		elif weight_indices is None:
+			self.weight_indices = np.arange(min(len(synapses), max_weights))
+		else:
+			self.weight_indices = np.asarray(weight_indices)[:max_weights]
+		self.interval = float(update_every)
+		self.fps = fps
+		self.window = float(window)
+		self.max_spikes = max_spikes
+		# One frame per update (at 0, interval, ...) and one for the final flush at the end of the run
+		self.num_frames = int(np.ceil(float(duration)/self.interval)) + 1
+		self.last = [mon.num_spikes for mon in self.monitors]
+		self.last_t = None
+		self.update_time = 0.
+		# Wall-clock times of the first and of the last update (the simulation loop, without compilation)
+		self.loop_start = self.loop_end = None
+
+		self._shm = {}
+		self._arrays = {}
+		self._specs = {'header': ((4,), np.int64),
+					   'times': ((self.num_frames,), np.float64),
+					   'rates': ((len(self.monitors), self.num_frames), np.float64),
+					   'weights': ((self.num_frames, len(self.weight_indices)), np.float64),
+					   'spikes': ((max_spikes, 3), np.float64)}  # columns: t, i, monitor
+		for key, (shape, dtype) in self._specs.items():
+			self._shm[key], self._arrays[key] = _shared_array(shape, dtype)
+
+		# At the start of a time step all the spikes before t have been recorded
+		self.operation = NetworkOperation(lambda t: self._update(float(t[:])), dt=update_every, when='start')
+		self.process = None
+		self.renderer_failed = False
+
+	def _update(self, t):
+		# t in second, all the spikes before t are published
+		start = time.perf_counter()
+		if self.loop_start is None:
+			self.loop_start = start
+		self._check_renderer()
+		header = self._arrays['header']
+		frame = header[FRAME]
+		if frame >= self.num_frames or (self.last_t is not None and t <= self.last_t):
+			return
+		interval = self.interval if self.last_t is None else t - self.last_t
+		spikes = self._arrays['spikes']
+		count = header[SPIKE_COUNT]
+		for k, mon in enumerate(self.monitors):
+			n = mon.num_spikes
+			new = n - self.last[k]
+			if new:
+				rows = (count + np.arange(new)) % self.max_spikes
+				spikes[rows, 0] = mon.t_[self.last[k]:n]
+				spikes[rows, 1] = mon.i[self.last[k]:n]
+				spikes[rows, 2] = k
+				count += new
+			self._arrays['rates'][k, frame] = new/(self.sizes[k]*interval)
+			self.last[k] = n
+		if len(self.weight_indices):
+			self._arrays['weights'][frame] = self.synapses.state(self.variable, use_units=False)[self.weight_indices]
+		self._arrays['times'][frame] = t
+		self.last_t = t
+		# The header is written last, the renderer only reads data up to the published frame
+		header[SPIKE_COUNT] = count
+		header[FRAME] = frame + 1
+		self.loop_end = time.perf_counter()
+		self.update_time += self.loop_end - start
+
+	def _check_renderer(self):
+		# Warn (once) if the renderer process died, the simulation goes on without dashboard
+		if self.process is None or self.renderer_failed or self.process.exitcode in (None, 0):
+			return
+		self.renderer_failed = True
+		warnings.warn('The dashboard renderer exited with code %d, the dashboard is not shown'
+					  % self.process.exitcode)
+
+	def start(self):
+		'''Start the renderer process.'''
+		names = dict((key, shm.name) for key, shm in self._shm.items())
+		# With 'spawn' or 'forkserver' the renderer would re-import (and re-run) an unguarded script
+		context = get_context('fork' if 'fork' in get_all_start_methods() else None)
+		self.process = context.Process(target=_render,
+									   args=(names, self._specs, self.names, self.sizes,
+											 self.fps, self.window, self.max_spikes))
+		self.process.daemon = True
+		self.process.start()
+
+	def flush(self, t):
+		'''Publish the data recorded since the last update, up to the end time t of the run (e.g. defaultclock.t).'''
+		self._update(float(np.asarray(t)))
+
+	def stop(self, t=None, wait=True):
+		'''
+		Tell the renderer that the run is over; with wait=True, wait until its window is closed.
+		t : end time of the run, the last interval is flushed to the renderer before stopping
+		With wait=False, the shared memory is released once the renderer has attached to it
+		(or has exited), in a background thread which keeps the script alive until then.
+		'''
+		if t is not None:
+			self.flush(t)
+		self._arrays['header'][DONE] = 1
+		if self.process is not None and wait:
+			self.process.join()
+		self._check_renderer()
+		if wait or not self._renderer_pending():
+			self.close()
+		else:
+			threading.Thread(target=self._close_when_attached).start()
+
+	def _renderer_pending(self):
+		# The renderer is running but has not attached to the shared memory yet
+		return (self.process is not None and not self._arrays['header'][ATTACHED]
+				and self.process.is_alive())
+
+	def _close_when_attached(self):
+		# Unlinking earlier would make the renderer fail to attach (FileNotFoundError)
+		while self._renderer_pending():
+			time.sleep(0.01)
+		self.close()
+
+	def close(self):
+		'''Release the shared memory.'''
+		self._arrays = {}
+		for shm in self._shm.values():
+			shm.close()
+			shm.unlink()
+		self._shm = {}
+
+	def overhead(self, run_time=None):
+		'''
+		Fraction of the (wall-clock) run time spent updating the shared memory.
+		run_time : by default the time of the simulation loop, from the first update to the last one
+			(call flush() at the end of the run first), which excludes the code generation of run()
+		'''
+		if run_time is None:
+			run_time = self.loop_end - self.loop_start
+		return self.update_time/run_time
+
+
+def _render(names, specs, labels, sizes, fps, window, max_spikes):
+	'''Renderer process: redraws the dashboard from the shared memory at most `fps` times per second.'''
+	import matplotlib.pyplot as plt
+
+	shms = {}
+	arrays = {}
+	for key, (shape, dtype) in specs.items():
+		shms[key], arrays[key] = _shared_array(shape, dtype, name=names[key])
+	header = arrays['header']
+	# From now on the simulation side may unlink the shared memory
+	header[ATTACHED] = 1
+	offsets = np.cumsum([0] + list(sizes))
+
+	plt.ion()
+	fig, (ax_raster, ax_rate, ax_weight) = plt.subplots(3, 1, figsize=(8, 9))
+	fig.suptitle('Live dashboard')
+	drawn = -1
+	while True:
+		done = header[DONE]
+		frame = int(header[FRAME])
+		if frame != drawn:
+			count = int(header[SPIKE_COUNT])
+			times = arrays['times'][:frame]
+			t_now = times[-1] if frame else 0.
+
+			ax_raster.cla()
+			n = min(count, max_spikes)
+			spikes = arrays['spikes'][(count - n + np.arange(n)) % max_spikes]
+			spikes = spikes[spikes[:, 0] >= t_now - window]
+			for k, label in enumerate(labels):
+				sel = spikes[:, 2] == k
+				# Neurons of the different monitors are stacked on top of each other
+				ax_raster.plot(spikes[sel, 0]/1e-3, spikes[sel, 1] + offsets[k], '.', c='C%d' % k, label=label)
+			ax_raster.set_xlabel('Time (ms)')
+			ax_raster.set_ylabel('Neuron index')
+			ax_raster.legend(loc='upper left')
+
+			ax_rate.cla()
+			for k, label in enumerate(labels):
+				ax_rate.plot(times/1e-3, arrays['rates'][k, :frame], c='C%d' % k, label=label)
+			ax_rate.set_xlabel('Time (ms)')
+			ax_rate.set_ylabel('Firing rate (Hz)')
+
+			ax_weight.cla()
+			if arrays['weights'].shape[1]:
+				ax_weight.plot(times/1e-3, arrays['weights'][:frame])
+			ax_weight.set_xlabel('Time (ms)')
+			ax_weight.set_ylabel('Weights')
+			drawn = frame
+		if done and drawn == int(header[FRAME]):
+			break
+		plt.pause(1./fps)
+
+	# The views on the shared memory have to be released before closing it
+	arrays = header = times = None
+	for shm in shms.values():
+		shm.close()
+	plt.ioff()
+	plt.show()
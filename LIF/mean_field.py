@@ -0,0 +1,158 @@
+## Mean-field approximation of the excitatory-inhibitory network of Excitatory_inhibitory_model.py
+## BRUNEL, Nicolas et WANG, Xiao-Jing. Journal of computational neuroscience, 2001, vol. 11, no 1, p. 63-85.
+# The steady-state population rates of P_E and P_I are predicted without simulating any spike:
+# 1. The synaptic gating variables are replaced by their mean values given the population rates.
+# 2. The voltage dependence of the NMDA current is linearized around the mean membrane potential.
+# 3. Each population is a conductance-based LIF neuron with an effective time constant, driven by
+#    Gaussian fluctuations coming from the fast (AMPA, GABA) synapses (diffusion approximation).
+# 4. The output rate is given by the Siegert formula, with the correction for synaptic filtering
+#    of Fourcaud & Brunel (2002), and the rates are iterated until self-consistency.
+# All parameters may be arrays (with units), so that whole parameter scans are solved at once:
+#	params = default_parameters()
+#	params['g_GABA_E'] = linspace(0.5, 5, 1000)*nS
+#	nu_E, nu_I = mean_field_rates(params)
+# calibrate() compares the predictions with spiking simulations of the same parameter sets.
+# The mean-field solver requires scipy (imported when it is used, the spiking simulations do not need it).
+
+import warnings
+
+from brian2 import *
+import numpy as np
+from ei_network import default_parameters, build_ei_network
+
+# Fourcaud & Brunel (2002): sqrt(2)*|zeta(1/2)|
+SYNAPTIC_FILTER_SHIFT = 2.0652
+# Nodes and weights of the Gauss-Legendre quadrature of the Siegert integral
+NODES, NODE_WEIGHTS = np.polynomial.legendre.leggauss(100)
+
+
+def _siegert(mu, sigma, tau, tau_rp, V_thr, V_reset, tau_syn):
+	'''Firing rate (Hz) of a LIF neuron driven by Gaussian noise (all arguments in SI units).'''
+	from scipy.special import erfcx
+	shift = SYNAPTIC_FILTER_SHIFT/2*np.sqrt(tau_syn/tau)
+	y_thr = (V_thr - mu)/sigma + shift
+	y_reset = (V_reset - mu)/sigma + shift
+	half = (y_thr - y_reset)/2
+	u = ((y_thr + y_reset)/2)[..., None] + half[..., None]*NODES
+	with np.errstate(over='ignore'):
+		# exp(u**2)*(1 + erf(u)) == erfcx(-u), without overflow for negative u
+		integral = half*np.sum(NODE_WEIGHTS*erfcx(-u), axis=-1)
+		return 1./(tau_rp + tau*np.sqrt(np.pi)*integral)
+
+
+def _population(pop, nu_E, nu_I, V_mean, p):
+	'''Output rate, mean potential and effective time constant of population pop ('E' or 'I').'''
+	n_E = p['N_E'] - 1 if pop == 'E' else p['N_E']	# E to E: i != j
+	n_I = p['p_I_E']*p['N_I'] if pop == 'E' else p['N_I'] - 1	# I to I: i != j
+	g_m, C_m = p['g_m_' + pop], p['C_m_' + pop]
+	g_ext, g_rec = p['g_AMPA_ext_' + pop], p['g_AMPA_rec_' + pop]
+	g_NMDA, g_GABA = p['g_NMDA_' + pop], p['g_GABA_' + pop]
+	V_E, V_I = p['V_E'], p['V_I']
+	tau_AMPA, tau_GABA = p['tau_AMPA'], p['tau_GABA']
+
+	# Mean gating variables
+	nu_ext = p['C_ext']*p['rate']
+	s_ext = nu_ext*tau_AMPA
+	s_AMPA = n_E*nu_E*tau_AMPA
+	x_NMDA = nu_E*p['tau_NMDA_decay']*p['alpha']*p['tau_NMDA_rise']
+	s_NMDA = n_E*x_NMDA/(1 + x_NMDA)
+	s_GABA = n_I*nu_I*tau_GABA
+
+	# NMDA current linearized around V_mean: I_NMDA ~ g_NMDA_eff*v + I_NMDA_0
+	J = 1 + p['Mg2']*np.exp(-0.062e3*V_mean)/3.57
+	slope = (1 + (V_mean - V_E)*0.062e3*(J - 1)/J)/J
+	g_NMDA_eff = g_NMDA*s_NMDA*slope
+	I_NMDA_0 = g_NMDA*s_NMDA*((V_mean - V_E)/J - slope*V_mean)
+
+	g_tot = g_m + g_ext*s_ext + g_rec*s_AMPA + g_NMDA_eff + g_GABA*s_GABA
+	mu = (g_m*p['V_L'] + (g_ext*s_ext + g_rec*s_AMPA)*V_E + g_GABA*s_GABA*V_I - I_NMDA_0)/g_tot
+	tau = C_m/g_tot
+
+	# Fluctuations of the fast synapses (shot noise -> white noise)
+	D2 = ((g_ext*(mu - V_E)*tau_AMPA)**2*nu_ext +
+		  (g_rec*(mu - V_E)*tau_AMPA)**2*n_E*nu_E +
+		  (g_GABA*(mu - V_I)*tau_GABA)**2*n_I*nu_I)
+	sigma = np.sqrt(D2*tau)/C_m
+
+	nu = _siegert(mu, sigma, tau, p['tau_rp_' + pop], p['V_thr'], p['V_reset'], tau_AMPA)
+	return nu, mu, tau
+
+
+def mean_field_rates(params=None, nu_E=1*Hz, nu_I=1*Hz, damping=0.2, max_iter=5000, tol=1e-4*Hz):
+	'''
+	Steady-state rates (nu_E, nu_I) of P_E and P_I predicted by the mean-field approximation.
+
+	params : dict of parameters as returned by default_parameters(), entries may be arrays
+	nu_E, nu_I : initial guesses, different initial guesses may lead to different
+		steady states in multi-stable regimes
+	damping : relaxation factor of the fixed-point iteration
+	Parameter sets for which the iteration does not converge give nan rates.
+	'''
+	if params is None:
+		params = default_parameters()
+	p = dict((name, np.asarray(value, dtype=float)) for name, value in params.items())
+	# np.broadcast() takes at most 32 arrays
+	shape = np.broadcast_shapes(*(value.shape for value in p.values()))
+	rates = {'E': np.full(shape, float(nu_E)), 'I': np.full(shape, float(nu_I))}
+	V_mean = {'E': np.full(shape, float(p['V_L'])), 'I': np.full(shape, float(p['V_L']))}
+	for _ in range(max_iter):
+		change = 0
+		new_rates = {}
+		for pop in ('E', 'I'):
+			nu, mu, tau = _population(pop, rates['E'], rates['I'], V_mean[pop], p)
+			new_rates[pop] = rates[pop] + damping*(nu - rates[pop])
+			# Mean potential including the resets (Brunel & Wang 2001)
+			V_mean[pop] = np.minimum(mu, p['V_thr']) - (p['V_thr'] - p['V_reset'])*nu*tau
+			change = np.maximum(change, np.abs(new_rates[pop] - rates[pop]))
+		rates = new_rates
+		if np.all(change < float(tol)):
+			break
+	else:
+		# Points which did not converge (e.g. oscillations, try a smaller damping) are set to nan
+		warnings.warn('Mean-field iteration did not converge for %d parameter set(s)'
+					  % np.sum(change >= float(tol)))
+		for pop in ('E', 'I'):
+			rates[pop] = np.where(change < float(tol), rates[pop], np.nan)
+	return rates['E']*Hz, rates['I']*Hz
+
+
+def simulate_spiking(params=None, duration=1*second, transient=200*ms, seed=42):
+	'''
+	Mean rates of P_E and P_I of a spiking simulation of the network of Excitatory_inhibitory_model.py
+	(built by ei_network.py) with the given (scalar) parameters, discarding the initial `transient`.
+	seed : seed of the counter-based random numbers (connections and external noise), as in the script
+	'''
+	if params is None:
+		params = default_parameters()
+	(P_E, P_I), (C_E_E, C_E_I, C_I_E, C_I_I), (C_P_E, C_P_I) = build_ei_network(params, seed)
+	E_mon = SpikeMonitor(P_E)
+	I_mon = SpikeMonitor(P_I)
+
+	net = Network(P_E, P_I, C_E_E, C_E_I, C_I_E, C_I_I, C_P_E, C_P_I, E_mon, I_mon)
+	net.run(transient)
+	n_E, n_I = E_mon.num_spikes, I_mon.num_spikes
+	net.run(duration - transient)
+	window = duration - transient
+	return ((E_mon.num_spikes - n_E)/(len(P_E)*window),
+			(I_mon.num_spikes - n_I)/(len(P_I)*window))
+
+
+def calibrate(param_sets, duration=1*second, transient=200*ms, seed=42, verbose=True):
+	'''
+	Compare the mean-field predictions with spiking simulations for a list of (scalar) parameter sets.
+	All the simulations use the same seed.
+	Returns one dict per parameter set with the predicted and simulated rates and the relative errors.
+	'''
+	results = []
+	for params in param_sets:
+		mf_E, mf_I = mean_field_rates(params)
+		sp_E, sp_I = simulate_spiking(params, duration=duration, transient=transient, seed=seed)
+		result = {'mean_field': (mf_E, mf_I),
+				  'spiking': (sp_E, sp_I),
+				  'error_E': abs(mf_E - sp_E)/max(sp_E, 1*Hz),
+				  'error_I': abs(mf_I - sp_I)/max(sp_I, 1*Hz)}
+		results.append(result)
+		if verbose:
+			print('P_E: mean-field %.2f Hz, spiking %.2f Hz | P_I: mean-field %.2f Hz, spiking %.2f Hz'
+				  % (mf_E/Hz, sp_E/Hz, mf_I/Hz, sp_I/Hz))
+	return results
@@ -0,0 +1,122 @@
+## Real-time streaming of a running Brian2 network.
+# The network is run ONCE for the whole duration in a worker thread, while the asyncio event loop
+# keeps serving the consumer(s). A NetworkOperation is called every `chunk` (e.g. 1 ms) and:
+# - publishes the new spikes of each SpikeMonitor to an asyncio.Queue,
+# - estimates the population rate of each monitored group over the chunk,
+# - tracks the wall-clock latency of the chunk and the real-time factor.
+# (Calling net.run() once per chunk instead would prepare the whole network again for every chunk.)
+# A real-time factor of 1 means that the simulation runs as fast as biological time,
+# larger values mean faster than real time.
+# A local stand-in consumer (consume_spikes) is included for testing closed-loop set-ups.
+
+import asyncio
+import time
+from functools import partial
+
+from brian2 import *
+
+
+async def stream_run(net, spike_monitors, duration, queue, chunk=1*ms, namespace=None):
+	'''
+	Run `net` for `duration` and publish one message per `chunk` of simulated time to `queue`.
+
+	spike_monitors : dict {name: SpikeMonitor} of the monitors to stream
+	namespace : namespace used to resolve the external constants of the model (e.g. globals()),
+		since the run is not started from the script itself.
+
+	Each message is a dict with the keys
+		't'			: simulated time at the end of the chunk (second)
+		'spikes'	: {name: (i, t)} the neuron indices and spike times (in second) of the new spikes
+		'rates'		: {name: rate} the population rate over the chunk (Hz)
+		'latency'	: wall-clock time needed for the chunk (second)
+		'rtf'		: real-time factor since the start of the streaming
+	A final `None` is put in the queue when the run is over.
+	Returns the list of chunk latencies.
+	'''
+	loop = asyncio.get_running_loop()
+	last = dict((name, mon.num_spikes) for name, mon in spike_monitors.items())
+	latencies = []
+	t_start = float(net.t)
+	clock = {'t': t_start}
+
+	def publish(t):
+		# t in second, at the start of a time step all the spikes before t have been recorded
+		now = time.perf_counter()
+		if 'wall' not in clock:
+			# First call, the time needed to prepare the network is not counted
+			clock['wall'] = clock['wall_start'] = now
+			return
+		spikes = {}
+		rates = {}
+		for name, mon in spike_monitors.items():
+			n = mon.num_spikes
+			spikes[name] = (mon.i[last[name]:n], mon.t_[last[name]:n])
+			rates[name] = (n - last[name])/(len(mon.source)*(t - clock['t']))
+			last[name] = n
+		latency = now - clock['wall']
+		latencies.append(latency)
+		msg = {'t': t,
+			   'spikes': spikes,
+			   'rates': rates,
+			   'latency': latency,
+			   'rtf': (t - t_start)/(now - clock['wall_start'])}
+		clock['t'], clock['wall'] = t, now
+		loop.call_soon_threadsafe(queue.put_nowait, msg)
+
+	operation = NetworkOperation(lambda t: publish(float(t[:])), dt=chunk, when='start')
+	net.add(operation)
+	try:
+		await loop.run_in_executor(None, partial(net.run, duration, namespace=namespace))
+		# The last chunk ends with the run
+		if float(net.t) > clock['t']:
+			publish(float(net.t))
+	finally:
+		net.remove(operation)
+		# Always tell the consumer(s) that the run is over, even if it failed
+		loop.call_soon(queue.put_nowait, None)
+	return latencies
+
+
+async def consume_spikes(queue, verbose=False):
+	'''
+	Stand-in for an external spike consumer: reads the messages of stream_run until
+	the final `None` and returns a summary with the spike counts, the mean rates and
+	the mean/max chunk latency.
+	'''
+	counts = {}
+	rates = {}
+	latencies = []
+	rtf = 0
+	while True:
+		msg = await queue.get()
+		if msg is None:
+			break
+		for name, (i, t) in msg['spikes'].items():
+			counts[name] = counts.get(name, 0) + len(i)
+			rates.setdefault(name, []).append(msg['rates'][name])
+		latencies.append(msg['latency'])
+		rtf = msg['rtf']
+		if verbose:
+			print('t = %.1f ms, rates: %s, latency = %.2f ms, RTF = %.2f'
+				  % (msg['t']/1e-3,
+					 ', '.join('%s %.1f Hz' % (name, r) for name, r in msg['rates'].items()),
+					 msg['latency']/1e-3, msg['rtf']))
+	return {'counts': counts,
+			'rates': dict((name, mean(r)) for name, r in rates.items()),
+			'mean_latency': mean(latencies) if latencies else 0,
+			'max_latency': max(latencies) if latencies else 0,
+			'rtf': rtf}
+
+
+def run_streaming(net, spike_monitors, duration, chunk=1*ms, namespace=None, verbose=False):
+	'''
+	Run the network in streaming mode with the local stand-in consumer and return its summary.
+	'''
+	async def main():
+		queue = asyncio.Queue()
+		producer = asyncio.ensure_future(stream_run(net, spike_monitors, duration, queue,
+													chunk=chunk, namespace=namespace))
+		summary = await consume_spikes(queue, verbose=verbose)
+		await producer
+		return summary
+	return asyncio.run(main())
@@ -0,0 +1,136 @@
+## Periodic, compressed snapshots of the whole weight matrix of a Synapses object.
+# Recording `w` with a StateMonitor stores every synapse at every time step. For analysis, the full
+# weight matrix every few hundred milliseconds is usually enough:
+# - the connectivity is stored ONCE in CSR form (indptr, indices), sorted by (i, j),
+# - each snapshot only stores the values array, aligned to the CSR structure,
+# - the values can be quantized (bits=8 or 16) and are delta-compressed: a snapshot is stored
+#   as the XOR with the previous one (unchanged weights give zero bytes) and compressed with zlib,
+#   with a full keyframe every `keyframe_every` snapshots,
+# - the snapshots are only decompressed when accessed.
+# Usage (stored in a variable so that run() collects it):
+#	W_snapshots = WeightSnapshotMonitor(S, 'w', interval=100*ms, bits=16, value_range=(0*mV, wmax))
+#	run(duration)
+#	W_snapshots.matrix(-1)		# scipy.sparse.csr_matrix of the last snapshot
+# The snapshots are unitless, in the SI unit of the variable (see `unit`).
+
+import zlib
+
+from brian2 import *
+from brian2.units.fundamentalunits import get_unit
+import numpy as np
+
+
+class WeightSnapshotMonitor(NetworkOperation):
+	'''
+	synapses : the Synapses object to record
+	variable : name of the synaptic variable to record
+	interval : simulated time between two snapshots
+	bits : None (lossless) or 8/16, number of bits of the quantized values
+	value_range : (min, max) range of the quantization, by default the range of each snapshot
+	delta : store each snapshot as the difference (XOR) to the previous one
+	keyframe_every : number of snapshots between two full (non-delta) snapshots
+	level : zlib compression level
+	'''
+	def __init__(self, synapses, variable='w', interval=100*ms, bits=None, value_range=None,
+				 delta=True, keyframe_every=10, level=1, name='weightsnapshotmonitor*'):
+		NetworkOperation.__init__(self, self._capture, dt=interval, when='end', name=name)
+		if bits not in (None, 8, 16):
+			raise ValueError('bits has to be None, 8 or 16, not %r' % bits)
+		self.synapses = synapses
+		self.variable = variable
+		self.unit = get_unit(synapses.variables[variable].dim)
+		self.bits = bits
+		self.value_range = None if value_range is None else (float(value_range[0]), float(value_range[1]))
+		self.delta = delta
+		self.keyframe_every = keyframe_every
+		self.level = level
+		self.csr_order = None
+		self.indptr = None
+		self.indices = None
+		self.shape = (len(synapses.source), len(synapses.target))
+		self._t = []
+		self._snapshots = []	# (compressed bytes, offset, scale)
+		self._previous = None
+		self._cache = (None, None)
+
+	def _structure(self):
+		i = np.asarray(self.synapses.i[:])
+		j = np.asarray(self.synapses.j[:])
+		self.csr_order = np.lexsort((j, i))
+		self.indices = j[self.csr_order]
+		self.indptr = np.concatenate(([0], np.cumsum(np.bincount(i, minlength=self.shape[0]))))
+
+	def _capture(self, t):
+		values = np.asarray(self.synapses.state(self.variable, use_units=False)[:], dtype=np.float64)
+		if self.csr_order is None:
+			self._structure()
+		elif len(values) != len(self.csr_order):
+			raise ValueError('The number of synapses changed from %d to %d, the snapshots '
+							 'need a fixed connectivity' % (len(self.csr_order), len(values)))
+		values = values[self.csr_order]
+		offset, scale = 0., 1.
+		if self.bits is not None:
+			if self.value_range is None:
+				low, high = (values.min(), values.max()) if len(values) else (0., 0.)
+			else:
+				low, high = self.value_range
+			offset = low
+			scale = (high - low)/(2**self.bits - 1) or 1.
+			dtype = np.uint8 if self.bits == 8 else np.uint16
+			values = np.round((np.clip(values, low, high) - offset)/scale).astype(dtype)
+		raw = values.view(np.uint8)
+		data = raw
+		if self.delta and len(self._snapshots) % self.keyframe_every != 0:
+			data = raw ^ self._previous
+		self._previous = raw
+		self._snapshots.append((zlib.compress(data.tobytes(), self.level), offset, scale))
+		self._t.append(float(t[:]))
+
+	def _raw(self, k):
+		'''Bytes of snapshot k, undoing the delta compression from the closest keyframe (or cache).'''
+		start = k - k % self.keyframe_every if self.delta else k
+		cached_k, cached = self._cache
+		if cached_k is not None and start <= cached_k <= k:
+			start, raw = cached_k + 1, cached
+		else:
+			raw = None
+		for n in range(start, k + 1):
+			data = np.frombuffer(zlib.decompress(self._snapshots[n][0]), dtype=np.uint8)
+			raw = data if raw is None or n % self.keyframe_every == 0 or not self.delta else raw ^ data
+		# The cached bytes are the base of the next delta decoding, they must not be modified
+		raw.flags.writeable = False
+		self._cache = (k, raw)
+		return raw
+
+	@property
+	def t(self):
+		'''Times of the snapshots.'''
+		return np.array(self._t)*second
+
+	def __len__(self):
+		return len(self._snapshots)
+
+	@property
+	def nbytes(self):
+		'''Total size of the compressed snapshots, in bytes.'''
+		return sum(len(data) for data, _, _ in self._snapshots)
+
+	def values(self, k):
+		'''Values of snapshot k (unitless, in `unit`), aligned to the CSR structure (indptr, indices).'''
+		k = range(len(self))[k]
+		raw = self._raw(k)
+		if self.bits is None:
+			return raw.view(np.float64).copy()
+		_, offset, scale = self._snapshots[k]
+		return offset + scale*raw.view(np.uint8 if self.bits == 8 else np.uint16)
+
+	def matrix(self, k):
+		'''Weight matrix of snapshot k as a scipy.sparse.csr_matrix of shape (N_source, N_target).'''
+		from scipy.sparse import csr_matrix
+		return csr_matrix((self.values(k), self.indices, self.indptr), shape=self.shape)
+
+	def synapse_values(self, k):
+		'''Values of snapshot k in the order of the synapses of the Synapses object.'''
+		values = np.empty(len(self.csr_order))
+		values[self.csr_order] = self.values(k)
+		return values